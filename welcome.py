@@ -30,34 +30,56 @@ async def log_to_channel(bot: commands.Bot, log_channel_id: int, level: str, msg
 # ---------------- Emoji handling ----------------
 
 _EMOJI_TOKEN = re.compile(r"{EMOJI:([^}]+)}")
+_MD_CHARS = re.compile(r"[`*_~]")
+_ROLE_LINE = re.compile(r"(Clan\s*Lead|Deput(?:y|ies))\s*[:：]\s*(.*)$", re.IGNORECASE)
+_CREW_HEADER = re.compile(r"\byour\b.*\bcrew\s*[:：]\s*$", re.IGNORECASE)
+_BLANK_RUNS = re.compile(r"\n{3,}")
 
 def _sanitize_emoji_name(name: str) -> str:
     return re.sub(r"[^a-z0-9_]", "", (name or "").lower())
 
+# Per-guild emoji lookup maps (by id and by lowercased name) so template
+# renders don't scan guild.emojis once per token. Built lazily; the cog
+# drops a guild's entry when its emojis change.
+_EMOJI_MAPS: dict[int, tuple[dict[int, discord.Emoji], dict[str, discord.Emoji]]] = {}
+
+def _guild_emoji_maps(guild: discord.Guild) -> tuple[dict[int, discord.Emoji], dict[str, discord.Emoji]]:
+    maps = _EMOJI_MAPS.get(guild.id)
+    if maps is None:
+        by_id: dict[int, discord.Emoji] = {}
+        by_name: dict[str, discord.Emoji] = {}
+        for e in guild.emojis:
+            by_id.setdefault(e.id, e)
+            by_name.setdefault(e.name.lower(), e)  # first match wins, like the old scan
+        maps = (by_id, by_name)
+        _EMOJI_MAPS[guild.id] = maps
+    return maps
+
 def _resolve_emoji(guild: discord.Guild, token: str) -> str:
     token = (token or "").strip()
+    by_id, by_name = _guild_emoji_maps(guild)
     # If numeric, treat as emoji ID
     if token.isdigit():
-        for e in guild.emojis:
-            if str(e.id) == token:
-                return f"<{'a' if e.animated else ''}:{e.name}:{e.id}>"
+        e = by_id.get(int(token))
+        if e:
+            return f"<{'a' if e.animated else ''}:{e.name}:{e.id}>"
         return token
     # Otherwise, match by (sanitized) name
-    want = _sanitize_emoji_name(token)
-    for e in guild.emojis:
-        if e.name.lower() == want:
-            return f"<{'a' if e.animated else ''}:{e.name}:{e.id}>"
+    e = by_name.get(_sanitize_emoji_name(token))
+    if e:
+        return f"<{'a' if e.animated else ''}:{e.name}:{e.id}>"
     return token
 
 def _replace_emoji_tokens(text: str, guild: discord.Guild) -> str:
     return _EMOJI_TOKEN.sub(lambda m: _resolve_emoji(guild, m.group(1)), text or "")
 
-def _emoji_cdn_url_from_id(guild: discord.Guild, emoji_id: int) -> Optional[str]:
+def _emoji_cdn_url_from_id(bot: commands.Bot, emoji_id: int) -> Optional[str]:
     try:
-        for e in guild.emojis:
-            if e.id == emoji_id:
-                ext = "gif" if e.animated else "png"
-                return f"https://cdn.discordapp.com/emojis/{emoji_id}.{ext}"
+        # bot.get_emoji is a direct dict lookup in the global emoji cache
+        e = bot.get_emoji(emoji_id)
+        if e:
+            ext = "gif" if e.animated else "png"
+            return f"https://cdn.discordapp.com/emojis/{emoji_id}.{ext}"
         # If not found in cache, assume png (Discord will serve it if valid)
         return f"https://cdn.discordapp.com/emojis/{emoji_id}.png"
     except Exception:
@@ -110,7 +132,7 @@ def _strip_empty_role_lines(text: str) -> str:
 
     def strip_md(s: str) -> str:
         # remove light markdown that can sit around labels/colons
-        return re.sub(r"[`*_~]", "", s)
+        return _MD_CHARS.sub("", s)
 
     def emptish(val: str) -> bool:
         v = norm(val).lower()
@@ -121,12 +143,11 @@ def _strip_empty_role_lines(text: str) -> str:
     # --- pass 1: drop empty role lines (detect on a "plain" copy with md stripped)
     kept = []
     role_kept_any = False
-    role_re = re.compile(r"(Clan\s*Lead|Deput(?:y|ies))\s*[:：]\s*(.*)$", re.IGNORECASE)
 
     for ln in lines:
         raw = norm(ln)
         plain = strip_md(raw)
-        m = role_re.search(plain)
+        m = _ROLE_LINE.search(plain)
         if m:
             tail = m.group(2)
             if emptish(tail):
@@ -142,7 +163,7 @@ def _strip_empty_role_lines(text: str) -> str:
         while i < len(kept):
             raw = norm(kept[i])
             plain = strip_md(raw)
-            if re.search(r"\byour\b.*\bcrew\s*[:：]\s*$", plain, re.IGNORECASE):
+            if _CREW_HEADER.search(plain):
                 # skip header
                 i += 1
                 # and a single blank line after it, if present
@@ -155,10 +176,32 @@ def _strip_empty_role_lines(text: str) -> str:
 
     # collapse extra blank lines
     cleaned = "\n".join(kept)
-    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned).strip("\n")
+    cleaned = _BLANK_RUNS.sub("\n\n", cleaned).strip("\n")
     return cleaned
 
 
+# ---------------- Cell helpers ----------------
+
+_TRUTHY = frozenset({"y", "yes", "1", "true"})
+
+def _flag(v: Any) -> bool:
+    """Sheet yes/no flag. Empty cells short-circuit to False; accepted truthy
+    spellings live in one frozenset instead of per-call comparisons."""
+    s = _text(v)
+    if not s:
+        return False
+    return s.lower() in _TRUTHY
+
+def _text(v: Any) -> str:
+    """Stripped string form of a sheet cell. Skips the str() boxing when the
+    value is already a string (the common case from get_all_records)."""
+    if isinstance(v, str):
+        return v.strip()
+    if v is None:
+        return ""
+    return str(v).strip()
+
+
 # ---------------- Row fallback merge ----------------
 
 def _merge_text_fields(primary: dict, default_row: Optional[dict]) -> dict:
@@ -203,6 +246,10 @@ class Welcome(commands.Cog):
         self.cache: Dict[str, Dict[str, Any]] = {}   # TAG -> row
         self.default_row: Optional[Dict[str, Any]] = None
 
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, guild: discord.Guild, before, after):
+        _EMOJI_MAPS.pop(guild.id, None)  # rebuild lazily on next render
+
     # ----- state -----
 
     @property
@@ -211,22 +258,23 @@ class Welcome(commands.Cog):
 
     async def reload_templates(self, _ctx_user: Optional[discord.Member] = None):
         try:
-            rows = self.get_rows()
+            # get_rows hits Google Sheets; keep it off the event loop
+            rows = await asyncio.to_thread(self.get_rows)
             cache, default_row = {}, None
             for r in rows:
-                tag = str(r.get("TAG", "")).strip()
+                tag = _text(r.get("TAG", ""))
                 if not tag:
                     continue
                 key = tag.upper()
                 row = {
                     "TAG": key,
-                    "TARGET_CHANNEL_ID": str(r.get("TARGET_CHANNEL_ID", "")).strip(),
+                    "TARGET_CHANNEL_ID": _text(r.get("TARGET_CHANNEL_ID", "")),
                     "TITLE": r.get("TITLE", "") or "",
                     "BODY": r.get("BODY", "") or "",
                     "FOOTER": r.get("FOOTER", "") or "",
-                    "CREST_URL": str(r.get("CREST_URL", "")).strip(),
-                    "PING_USER": str(r.get("PING_USER", "")).strip().upper() == "Y",
-                    "ACTIVE": str(r.get("ACTIVE", "")).strip().upper() == "Y",
+                    "CREST_URL": _text(r.get("CREST_URL", "")),
+                    "PING_USER": _flag(r.get("PING_USER", "")),
+                    "ACTIVE": _flag(r.get("ACTIVE", "")),
                     "CLAN": r.get("CLAN", "") or "",
                     "CLANLEAD": r.get("CLANLEAD", "") or "",
                     "DEPUTIES": r.get("DEPUTIES", "") or "",
@@ -359,7 +407,7 @@ class Welcome(commands.Cog):
         if foot:
             icon_url = None
             if self.c1c_footer_emoji_id:
-                icon_url = _emoji_cdn_url_from_id(ctx.guild, self.c1c_footer_emoji_id)
+                icon_url = _emoji_cdn_url_from_id(self.bot, self.c1c_footer_emoji_id)
             if icon_url:
                 embed.set_footer(text=foot, icon_url=icon_url)
             else:
@@ -395,14 +443,17 @@ class Welcome(commands.Cog):
                     "Be loud, be nerdy, and maybe even helpful. You know the drill, C1C.")
         await self._send_general_notice(ctx.guild, gen_text, target_member, tag, clan_name)
 
-        # cleanup the invoking command to keep chats tidy
-        try:
-            await asyncio.sleep(2)
-            await ctx.message.delete()
-        except Exception:
-            await log_to_channel(self.bot, self.log_channel_id, "WARN",
-                "Cleanup warning • message delete failed",
-                channel=getattr(ctx.channel, 'id', None), user=f"@{ctx.author.display_name}")
+        # cleanup the invoking command to keep chats tidy; scheduled in the
+        # background so the command finishes without holding the 2 s delay
+        async def _cleanup():
+            try:
+                await asyncio.sleep(2)
+                await ctx.message.delete()
+            except Exception:
+                await log_to_channel(self.bot, self.log_channel_id, "WARN",
+                    "Cleanup warning • message delete failed",
+                    channel=getattr(ctx.channel, 'id', None), user=f"@{ctx.author.display_name}")
+        asyncio.create_task(_cleanup())
 
     @commands.command(name="welcome-refresh")
     async def welcome_refresh(self, ctx: commands.Context):